@@ -1,10 +1,26 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import os
 import time
 import base64
+import asyncio
+import hashlib
+import shutil
 from pathlib import Path
 
+try:
+    import aiohttp
+except ImportError:
+    # aiohttp 不可用时批量合成退化为顺序请求
+    aiohttp = None
+
+
+# 权限检查结果缓存，有效期内跳过启动时的两次探测请求
+PERMISSION_CACHE_PATH = Path.home() / ".cache" / "glm_voice_clone.json"
+PERMISSION_CACHE_TTL = 24 * 3600
+
 
 class GLMVoiceClone:
     """智谱AI音色复刻完整实现"""
@@ -16,13 +32,75 @@ class GLMVoiceClone:
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
-
-    def check_permissions(self):
-        """检查API权限和可用服务"""
+        # 复用同一个Session，通过keep-alive和连接池摊薄TLS握手开销
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            # 重试用尽后返回最后一次响应，由调用方按状态码处理；TTS请求为POST，需显式允许重试
+            max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504],
+                              allowed_methods=frozenset({"GET", "POST"}), raise_on_status=False)
+        ))
+        # 已确认存在的输出目录，避免每次写文件前重复stat/mkdir
+        self._ensured_dirs = set()
+        # TTS接口地址，各请求共用
+        self.speech_url = f"{self.base_url}/audio/speech"
+
+    def close(self):
+        """关闭底层HTTP连接池"""
+        self.session.close()
+
+    def _ensure_output_dir(self, output_path):
+        """确保输出文件所在目录存在"""
+        out_dir = os.path.dirname(output_path) or "."
+        if out_dir not in self._ensured_dirs:
+            os.makedirs(out_dir, exist_ok=True)
+            self._ensured_dirs.add(out_dir)
+
+    def _key_fingerprint(self):
+        """API密钥的摘要，缓存文件中不保存明文密钥"""
+        return hashlib.sha256(self.api_key.encode("utf-8")).hexdigest()[:16]
+
+    def _permissions_cached(self):
+        """缓存未过期且属于当前密钥时返回True"""
+        try:
+            cached = json.loads(PERMISSION_CACHE_PATH.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        # 内容格式不对时视为没有缓存，重新探测
+        if not isinstance(cached, dict):
+            return False
+        ts = cached.get("ts")
+        if not isinstance(ts, (int, float)) or isinstance(ts, bool):
+            return False
+        return (
+            cached.get("ok") is True
+            and cached.get("key") == self._key_fingerprint()
+            and time.time() - ts < PERMISSION_CACHE_TTL
+        )
+
+    def _save_permissions_cache(self):
+        """记录本次权限检查通过，写入失败不影响主流程"""
+        try:
+            PERMISSION_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            PERMISSION_CACHE_PATH.write_text(
+                json.dumps({"ts": time.time(), "ok": True, "key": self._key_fingerprint()}),
+                encoding="utf-8"
+            )
+        except OSError:
+            pass
+
+    def check_permissions(self, force=False):
+        """检查API权限和可用服务，24小时内检查通过过则直接返回"""
         print("=== 检查API权限 ===")
 
+        if not force and self._permissions_cached():
+            print("✅ 权限检查结果已缓存，跳过探测")
+            return True
+
         try:
-            response = requests.get(f"{self.base_url}/models", headers=self.headers, timeout=10)
+            response = self.session.get(f"{self.base_url}/models", timeout=10)
             if response.status_code == 200:
                 models = [m["id"] for m in response.json().get("data", [])]
                 print(f"✅ 基础API权限正常")
@@ -36,6 +114,7 @@ class GLMVoiceClone:
             tts_test = self._test_tts_api()
             if tts_test:
                 print("✅ TTS服务可用")
+                self._save_permissions_cache()
                 return True
             else:
                 print("⚠️  TTS服务可能需要额外权限，但将继续尝试")
@@ -48,14 +127,14 @@ class GLMVoiceClone:
     def _test_tts_api(self):
         """测试TTS API是否可用"""
         try:
-            url = f"{self.base_url}/audio/speech"
+            url = self.speech_url
             data = {
                 "model": "glm-tts",
                 "input": "测试",
                 "voice": "female"  # 使用正确的音色名
             }
 
-            response = requests.post(url, headers=self.headers, json=data, timeout=10)
+            response = self.session.post(url, json=data, timeout=10)
             return response.status_code in [200, 400, 422]
         except:
             return False
@@ -82,7 +161,7 @@ class GLMVoiceClone:
         print(f"🎵 音色: {voice_type}")
 
         # 智谱AI TTS API端点
-        url = f"{self.base_url}/audio/speech"
+        url = self.speech_url
 
         # 根据智谱AI文档构建请求
         data = {
@@ -95,28 +174,30 @@ class GLMVoiceClone:
 
         try:
             print("🔄 发送TTS请求...")
-            response = requests.post(url, headers=self.headers, json=data, timeout=30)
+            # 流式接收并直接写盘，避免整段音频先缓存在内存中
+            with self.session.post(url, json=data, timeout=30, stream=True) as response:
+                if response.status_code == 200:
+                    # 确保输出目录存在
+                    self._ensure_output_dir(output_path)
 
-            if response.status_code == 200:
-                # 确保输出目录存在
-                os.makedirs(os.path.dirname(output_path) if os.path.dirname(output_path) else ".", exist_ok=True)
+                    response.raw.decode_content = True
+                    with open(output_path, "wb") as f:
+                        shutil.copyfileobj(response.raw, f, 64 * 1024)
 
-                with open(output_path, "wb") as f:
-                    f.write(response.content)
+                    file_size = os.path.getsize(output_path)
+                    print(f"✅ TTS音频保存成功: {output_path} ({file_size}字节)")
+                    return output_path
 
-                file_size = os.path.getsize(output_path)
-                print(f"✅ TTS音频保存成功: {output_path} ({file_size}字节)")
-                return output_path
-            else:
+                error_text = response.text
                 print(f"❌ TTS失败: {response.status_code}")
-                print(f"错误信息: {response.text}")
+                print(f"错误信息: {error_text}")
 
-                # 尝试其他音色
-                if "音色不存在" in response.text:
-                    print("🔄 尝试使用默认音色...")
-                    return self._try_default_voices(text, output_path)
+            # 尝试其他音色
+            if "音色不存在" in error_text:
+                print("🔄 尝试使用默认音色...")
+                return self._try_default_voices(text, output_path)
 
-                return None
+            return None
 
         except Exception as e:
             print(f"❌ TTS异常: {e}")
@@ -128,7 +209,7 @@ class GLMVoiceClone:
 
         for voice in default_voices:
             print(f"🔄 尝试音色: {voice}")
-            url = f"{self.base_url}/audio/speech"
+            url = self.speech_url
             data = {
                 "model": "glm-tts",
                 "input": text,
@@ -138,12 +219,14 @@ class GLMVoiceClone:
             }
 
             try:
-                response = requests.post(url, headers=self.headers, json=data, timeout=30)
-                if response.status_code == 200:
-                    with open(output_path, "wb") as f:
-                        f.write(response.content)
-                    print(f"✅ 使用音色 {voice} 成功生成音频: {output_path}")
-                    return output_path
+                with self.session.post(url, json=data, timeout=30, stream=True) as response:
+                    if response.status_code == 200:
+                        self._ensure_output_dir(output_path)
+                        response.raw.decode_content = True
+                        with open(output_path, "wb") as f:
+                            shutil.copyfileobj(response.raw, f, 64 * 1024)
+                        print(f"✅ 使用音色 {voice} 成功生成音频: {output_path}")
+                        return output_path
             except:
                 continue
 
@@ -186,6 +269,97 @@ class GLMVoiceClone:
             print(f"❌ 音色 {voice_name} 测试失败")
             return False
 
+    @staticmethod
+    async def _stream_to_file_async(response, output_path, chunk_size=64 * 1024):
+        """按块接收异步响应并写盘，写文件放到线程中执行，避免阻塞事件循环"""
+        file_size = 0
+        f = await asyncio.to_thread(open, output_path, "wb")
+        try:
+            async for chunk in response.content.iter_chunked(chunk_size):
+                await asyncio.to_thread(f.write, chunk)
+                file_size += len(chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+        return file_size
+
+    async def _tts_async(self, session, text, voice, output_path):
+        """异步TTS请求，供批量合成并发调用"""
+        url = self.speech_url
+        data = {
+            "model": "glm-tts",
+            "input": text,
+            "voice": voice,
+            "speed": 1.0,
+            "response_format": "mp3"
+        }
+
+        try:
+            async with session.post(url, json=data) as response:
+                if response.status == 200:
+                    self._ensure_output_dir(output_path)
+                    file_size = await self._stream_to_file_async(response, output_path)
+                    print(f"✅ TTS音频保存成功: {output_path} ({file_size}字节)")
+                    return output_path
+
+                error_text = await response.text()
+                print(f"❌ TTS失败 ({voice}): {response.status}")
+                print(f"错误信息: {error_text}")
+
+            # 与standard_tts一致，音色不存在时尝试其他音色
+            if "音色不存在" in error_text:
+                print("🔄 尝试使用默认音色...")
+                return await self._try_default_voices_async(session, text, output_path)
+
+            return None
+
+        except Exception as e:
+            print(f"❌ TTS异常 ({voice}): {e}")
+            return None
+
+    async def _try_default_voices_async(self, session, text, output_path):
+        """异步版本的_try_default_voices，依次尝试默认音色"""
+        default_voices = ["alloy", "echo", "fable", "onyx", "nova", "shimmer"]
+
+        for voice in default_voices:
+            print(f"🔄 尝试音色: {voice}")
+            data = {
+                "model": "glm-tts",
+                "input": text,
+                "voice": voice,
+                "speed": 1.0,
+                "response_format": "mp3"
+            }
+
+            try:
+                async with session.post(self.speech_url, json=data) as response:
+                    if response.status == 200:
+                        self._ensure_output_dir(output_path)
+                        await self._stream_to_file_async(response, output_path)
+                        print(f"✅ 使用音色 {voice} 成功生成音频: {output_path}")
+                        return output_path
+            except Exception:
+                continue
+
+        print("❌ 所有音色都尝试失败")
+        return None
+
+    async def batch_tts(self, items):
+        """
+        并发批量合成
+        :param items: (文本, 音色, 输出路径) 组成的列表
+        :return: 与items顺序一致的输出路径列表，失败项为None
+        """
+        if aiohttp is None:
+            return [self.standard_tts(text, voice, output_path) for text, voice, output_path in items]
+
+        connector = aiohttp.TCPConnector(limit=16, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=30)
+        async with aiohttp.ClientSession(headers=self.headers, connector=connector, timeout=timeout) as session:
+            return await asyncio.gather(*[
+                self._tts_async(session, text, voice, output_path)
+                for text, voice, output_path in items
+            ])
+
 
 def main():
     """主函数 - 演示使用"""
@@ -226,12 +400,20 @@ def main():
         # 测试其他音色
         print("\n🔊 测试其他音色...")
         test_voices = ["male", "alloy", "nova"]
-        for voice in test_voices:
-            voice_clone.test_voice(voice, f"这是{voice}音色的测试")
+        results = asyncio.run(voice_clone.batch_tts([
+            (f"这是{voice}音色的测试", voice, f"output/test_{voice}.mp3") for voice in test_voices
+        ]))
+        for voice, result in zip(test_voices, results):
+            if result:
+                print(f"✅ 音色 {voice} 测试成功")
+            else:
+                print(f"❌ 音色 {voice} 测试失败")
     else:
         print(f"\n❌ 语音合成失败")
         print("💡 请检查API Key和网络连接")
 
+    voice_clone.close()
+
 
 def batch_demo():
     """批量处理演示"""
@@ -251,18 +433,23 @@ def batch_demo():
 
     print("🔊 批量语音合成演示")
 
+    items = []
     for i, (text, voice) in enumerate(zip(texts, voices), 1):
         print(f"\n📝 处理第 {i} 段文本: {text}")
         print(f"🎵 使用音色: {voice}")
+        items.append((text, voice, f"output/batch_output_{i}_{voice}.mp3"))
 
-        output_file = f"output/batch_output_{i}_{voice}.mp3"
-        result = voice_clone.standard_tts(text, voice, output_file)
+    # 所有请求并发发出，总耗时约等于最慢的一次请求
+    results = asyncio.run(voice_clone.batch_tts(items))
 
+    for i, result in enumerate(results, 1):
         if result:
             print(f"✅ 第 {i} 段处理成功")
         else:
             print(f"❌ 第 {i} 段处理失败")
 
+    voice_clone.close()
+
 
 def interactive_demo():
     """交互式演示"""
@@ -309,6 +496,8 @@ def interactive_demo():
     else:
         print(f"\n❌ 合成失败")
 
+    voice_clone.close()
+
 
 if __name__ == "__main__":
     print("请选择运行模式:")
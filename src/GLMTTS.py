@@ -1,5 +1,9 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import base64
 import json
+import logging
 import os
 from pathlib import Path
 
@@ -11,15 +15,32 @@ class GLMTTS:
         :param api_key: 智谱AI的API密钥
         """
         self.api_url = "https://open.bigmodel.cn/api/paas/v4/audio/speech"  # 完整的API链接
+        self.logger = logging.getLogger(__name__)
         self.headers = {
             'Authorization': f'Bearer {api_key}',
             'Content-Type': 'application/json'
         }
+        # 复用同一个Session，通过keep-alive和连接池摊薄TLS握手开销
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            # 重试用尽后返回最后一次响应，由调用方按状态码处理；TTS请求为POST，需显式允许重试
+            max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504],
+                              allowed_methods=frozenset({"GET", "POST"}), raise_on_status=False)
+        ))
+
+    def close(self):
+        """关闭底层HTTP连接池"""
+        self.session.close()
 
     def text_to_speech(self, text, voice="tongtong", response_format="pcm",
                        stream=False, speed=1.0, volume=1.0, watermark_enabled=True):
         """
         将文本转换为语音
+        :return: stream=False时返回完整音频bytes；stream=True时返回按块产出bytes的生成器
+                 （原始音频按块读取，SSE事件中的base64音频逐个解码）
         """
         # 检查文本长度
         if len(text) > 1024:
@@ -42,14 +63,16 @@ class GLMTTS:
         if not watermark_enabled:
             data["watermark_enabled"] = watermark_enabled
 
-        print(f"请求数据: {json.dumps(data, ensure_ascii=False)}")
+        # 仅在DEBUG级别输出请求数据，%s格式化延迟到日志真正输出时
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("请求数据: %s", data)
 
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.api_url,
-                headers=self.headers,
                 json=data,
-                timeout=30
+                timeout=30,
+                stream=stream
             )
 
             print(f"响应状态码: {response.status_code}")
@@ -58,6 +81,16 @@ class GLMTTS:
                 content_type = response.headers.get('Content-Type', '')
                 print(f"响应Content-Type: {content_type}")
 
+                if stream:
+                    # 只有原始音频才能逐块直接落盘
+                    if content_type.startswith('audio/') or 'octet-stream' in content_type:
+                        print("开始接收流式音频数据")
+                        return self._iter_audio(response)
+                    # SSE事件中的音频为base64编码，逐个事件解码后产出
+                    if 'event-stream' in content_type:
+                        print("开始接收SSE流式音频数据")
+                        return self._iter_sse_audio(response)
+
                 if 'audio' in content_type or response.content:
                     print("成功获取音频数据")
                     return response.content
@@ -86,17 +119,73 @@ class GLMTTS:
             print(f"网络请求异常: {str(e)}")
             raise Exception(f"网络请求错误: {str(e)}")
 
+    @staticmethod
+    def _iter_sse_audio(response):
+        """
+        逐个解析SSE事件并产出解码后的音频数据，读取结束后释放连接
+        每个事件形如 data: {"choices": [{"delta": {"content": "<base64音频>"}}]}，以 data: [DONE] 结束
+        """
+        try:
+            for line in response.iter_lines():
+                if not line.startswith(b"data:"):
+                    continue
+                payload = line[5:].strip()
+                if payload == b"[DONE]":
+                    break
+
+                try:
+                    event = json.loads(payload)
+                except ValueError:
+                    raise Exception(f"无法解析的SSE事件: {payload[:200]!r}")
+                if not isinstance(event, dict):
+                    raise Exception(f"无法解析的SSE事件: {payload[:200]!r}")
+                if "error" in event:
+                    raise Exception(f"API返回错误: {event['error']}")
+
+                for choice in event.get("choices") or ():
+                    content = (choice.get("delta") or {}).get("content")
+                    if content:
+                        yield base64.b64decode(content)
+        except requests.exceptions.RequestException as e:
+            print(f"网络请求异常: {str(e)}")
+            raise Exception(f"网络请求错误: {str(e)}")
+        finally:
+            response.close()
+
+    @staticmethod
+    def _iter_audio(response, chunk_size=4096):
+        """逐块产出流式响应中的音频数据，读取结束后释放连接"""
+        try:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    yield chunk
+        except requests.exceptions.RequestException as e:
+            print(f"网络请求异常: {str(e)}")
+            raise Exception(f"网络请求错误: {str(e)}")
+        finally:
+            response.close()
+
 
 def save_pcm_to_file(pcm_data, filename, output_dir="audio_output"):
-    """保存PCM数据到文件"""
+    """
+    保存PCM数据到文件
+    :param pcm_data: 完整的bytes，或流式模式下按块产出bytes的可迭代对象
+    """
     Path(output_dir).mkdir(exist_ok=True)
     file_path = os.path.join(output_dir, f"{filename}.pcm")
 
+    if isinstance(pcm_data, (bytes, bytearray)):
+        pcm_data = (pcm_data,)
+
+    total_size = 0
     with open(file_path, 'wb') as f:
-        f.write(pcm_data)
+        # 边接收边写盘，首个数据块到达即可开始落盘
+        for chunk in pcm_data:
+            f.write(chunk)
+            total_size += len(chunk)
 
     print(f"PCM音频已保存到: {file_path}")
-    print(f"文件大小: {len(pcm_data)} 字节")
+    print(f"文件大小: {total_size} 字节")
     return file_path
 
 
@@ -117,7 +206,7 @@ def main():
         print("\n=== 开始文本转语音 ===")
         print(f"转换文本: {text}")
 
-        # 调用API（使用最简参数）
+        # 调用API
         pcm_data = tts_client.text_to_speech(
             text=text,
             voice="tongtong",
@@ -134,7 +223,7 @@ def main():
         # 显示文件信息
         print(f"\n📁 文件信息:")
         print(f"位置: {os.path.abspath(pcm_file_path)}")
-        print(f"大小: {len(pcm_data)} 字节")
+        print(f"大小: {os.path.getsize(pcm_file_path)} 字节")
 
     except Exception as e:
         print(f"❌ 错误: {str(e)}")
@@ -145,6 +234,8 @@ def main():
         print("2. 检查网络连接")
         print("3. 确认账号有足够的余额或权限")
         print("4. 尝试使用不同的文本或参数")
+    finally:
+        tts_client.close()
 
 
 # 简单的测试函数
@@ -1,7 +1,70 @@
-import csv
+from collections.abc import Mapping, Sequence
 from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 import logging
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+
+class FrameView(Mapping):
+    """
+    单帧blendshape数据的只读视图
+    按名称访问时才从底层数组取值，不会为整帧构建字典；
+    与原先的逐帧字典一致，缺失值(NaN)对应的名称不出现在视图中
+    """
+
+    __slots__ = ('_a', '_m', '_f')
+
+    def __init__(self, arr: np.ndarray, name_to_col: Dict[str, int], frame: int):
+        self._a = arr
+        self._m = name_to_col
+        self._f = frame
+
+    def __getitem__(self, name: str) -> float:
+        value = self._a[self._f, self._m[name]]
+        if np.isnan(value):
+            raise KeyError(name)
+        return float(value)
+
+    def __iter__(self):
+        row = self._a[self._f]
+        return (name for name, col in self._m.items() if not np.isnan(row[col]))
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(~np.isnan(self._a[self._f])))
+
+    def to_dict(self) -> Dict[str, float]:
+        """转换为普通字典，跳过缺失值"""
+        return {name: value for name, value in zip(self._m, self._a[self._f].tolist())
+                if not math.isnan(value)}
+
+
+class FrameSequence(Sequence):
+    """
+    全部帧的只读序列视图，兼容原先 List[Dict[str, float]] 的用法
+    （真值判断、len、按下标取帧、迭代），每帧以FrameView按需取值
+    """
+
+    __slots__ = ('_reader',)
+
+    def __init__(self, reader: 'BlendshapeReader'):
+        self._reader = reader
+
+    def __len__(self) -> int:
+        return self._reader.get_frame_count()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        frame = self._reader.get_frame_data(index)
+        if frame is None:
+            raise IndexError("帧下标越界")
+        return frame
 
 
 class BlendshapeReader:
@@ -10,17 +73,30 @@ class BlendshapeReader:
     用于读取CSV格式的blendshape动画数据
     """
 
-    def __init__(self, log_level=logging.INFO):
+    # 量化模式下uint8编码255保留给缺失值(NaN)，有效值使用0-254
+    _Q_MISSING = 255
+
+    def __init__(self, log_level=logging.INFO, quantize: bool = False):
         """
         初始化Blendshape读取器
 
         Args:
             log_level: 日志级别
+            quantize: 为True时加载后将数据量化为uint8存储（约0.4%精度损失，内存为float32的1/4）
         """
         self.logger = self._setup_logger(log_level)
-        self.data = []
+        self.quantize = quantize
+        # 所有帧的blendshape值存放在一个 (帧数, 通道数) 的float32数组中，缺失值为NaN
+        self.values: Optional[np.ndarray] = np.empty((0, 0), dtype=np.float32)
+        # 量化模式下values为None，数据以 values_q * scale + offset 的形式保存
+        self.values_q: Optional[np.ndarray] = None
+        self.scale = 1.0
+        self.offset = 0.0
+        self.name_to_col: Dict[str, int] = {}
         self.column_names = []
         self.timestamps = []
+        # 各通道的统计量，加载时一次性计算
+        self._reset_stats()
 
     def _setup_logger(self, level):
         """设置日志器"""
@@ -37,71 +113,165 @@ class BlendshapeReader:
 
         return logger
 
-    def read_csv(self, file_path: str) -> Optional[List[Dict[str, float]]]:
+    def read_csv(self, file_path: str, force_reparse: bool = False) -> Optional[FrameSequence]:
         """
         从CSV文件读取blendshape数据并直接返回
 
+        首次解析后会在CSV旁生成 .npy 和 .meta.json 缓存文件，
+        之后若缓存不旧于CSV，则直接以内存映射方式加载缓存
+
         Args:
             file_path: CSV文件路径
+            force_reparse: 为True时忽略缓存，重新解析CSV
 
         Returns:
-            Optional[List[Dict[str, float]]]: 读取成功返回数据列表，失败返回None
+            Optional[FrameSequence]: 读取成功返回按帧访问的数据序列，失败返回None；
+                需要整块数组时使用 get_blendshape_array()
         """
         try:
             file_path = Path(file_path)
             if not file_path.exists():
-                self.logger.error(f"文件不存在: {file_path}")
+                self.logger.error("文件不存在: %s", file_path)
                 return None
 
-            self.logger.info(f"开始读取文件: {file_path}")
+            cache_path = file_path.with_suffix('.npy')
+            meta_path = file_path.with_suffix('.meta.json')
+            if not force_reparse and self._load_cache(file_path, cache_path, meta_path):
+                self.logger.info("从缓存加载 %d 行blendshape数据: %s", self.values.shape[0], cache_path)
+                return self._on_loaded()
 
-            with open(file_path, 'r', encoding='utf-8') as file:
-                # 使用csv.reader读取逗号分隔的文件
-                csv_reader = csv.reader(file)
+            self.logger.info("开始读取文件: %s", file_path)
 
-                # 第一行就是列名
-                self.column_names = next(csv_reader)
-                self.logger.info(f"检测到列名: {self.column_names[:5]}...")
-                self.logger.info(f"总列数: {len(self.column_names)}")
+            # 第一行就是列名
+            self.column_names = pd.read_csv(file_path, nrows=0, encoding='utf-8').columns.tolist()
+            self.logger.info("检测到列名: %s...", self.column_names[:5])
+            self.logger.info("总列数: %d", len(self.column_names))
 
-                # 验证列数
-                if len(self.column_names) < 3:
-                    self.logger.error(f"列数不足，期望至少3列，实际{len(self.column_names)}列")
-                    return None
+            # 验证列数
+            if len(self.column_names) < 3:
+                self.logger.error("列数不足，期望至少3列，实际%d列", len(self.column_names))
+                return None
 
-                # 读取数据行
-                self.data = []
-                self.timestamps = []
-                line_count = 0
+            # 从第3列开始是blendshape值，由C解析器直接转换为float32，空单元格记为NaN
+            blendshape_names = self.column_names[2:]
+            dtypes = {name: np.float32 for name in blendshape_names}
+            dtypes[self.column_names[0]] = str
+            try:
+                df = pd.read_csv(file_path, engine='c', encoding='utf-8', dtype=dtypes,
+                                 na_values=[''], keep_default_na=False)
+                blendshapes = df.iloc[:, 2:]
+            except ValueError:
+                # 存在非数值单元格时退回不指定类型读取，再逐列转换，无法解析的单元格记为NaN
+                self.logger.warning("存在无法解析为数值的单元格，将按缺失值处理")
+                df = pd.read_csv(file_path, engine='c', encoding='utf-8',
+                                 dtype={self.column_names[0]: str},
+                                 na_values=[''], keep_default_na=False)
+                blendshapes = df.iloc[:, 2:].apply(pd.to_numeric, errors='coerce')
+
+            self.timestamps = df.iloc[:, 0].astype(str).tolist()
+            self.values = np.ascontiguousarray(blendshapes.to_numpy(np.float32))
+            self.name_to_col = {name: i for i, name in enumerate(blendshape_names)}
+
+            self.logger.info("成功读取 %d 行blendshape数据", self.values.shape[0])
+            self._save_cache(cache_path, meta_path)
+            return self._on_loaded()
 
-                for row in csv_reader:
-                    if row:  # 跳过空行
-                        if len(row) >= 3:
-                            timestamp = row[0]
+        except Exception as e:
+            self.logger.error("读取文件时发生错误: %s", e)
+            if self.logger.isEnabledFor(logging.ERROR):
+                import traceback
+                self.logger.error(traceback.format_exc())
+            return None
 
-                            # 创建字典映射（从第3列开始是blendshape值）
-                            blendshape_dict = {}
-                            for i in range(2, min(len(row), len(self.column_names))):
-                                try:
-                                    value = float(row[i])
-                                    blendshape_dict[self.column_names[i]] = value
-                                except (ValueError, IndexError):
-                                    continue
+    def _on_loaded(self) -> FrameSequence:
+        """数据加载完成后的处理：计算统计量并按需量化"""
+        self.values_q = None
+        self._compute_stats()
+        if self.quantize:
+            self._quantize()
+        return self.get_blendshape_data()
+
+    def _reset_stats(self):
+        """重置各通道统计量"""
+        self._mins = np.empty(0, dtype=np.float32)
+        self._maxs = np.empty(0, dtype=np.float32)
+        self._means = np.empty(0, dtype=np.float64)
+        self._counts = np.empty(0, dtype=np.int64)
+
+    def _compute_stats(self):
+        """一次遍历计算所有通道的最小值、最大值、平均值和有效值个数（忽略NaN）"""
+        values = np.asarray(self.values, dtype=np.float32)
+        valid = ~np.isnan(values)
+        self._counts = valid.sum(axis=0)
+        self._mins = np.min(values, axis=0, where=valid, initial=np.inf)
+        self._maxs = np.max(values, axis=0, where=valid, initial=-np.inf)
+        self._means = np.sum(values, axis=0, where=valid, dtype=np.float64) / np.maximum(self._counts, 1)
+
+    def _quantize(self):
+        """将float32数据量化为uint8，只保留量化结果"""
+        values = np.asarray(self.values, dtype=np.float32)
+        missing = np.isnan(values)
+
+        if missing.all():
+            low, high = 0.0, 0.0
+        else:
+            low, high = float(np.nanmin(values)), float(np.nanmax(values))
 
-                            self.data.append(blendshape_dict)
-                            self.timestamps.append(timestamp)
-                            line_count += 1
+        self.offset = low
+        self.scale = (high - low) / (self._Q_MISSING - 1) or 1.0
 
-                self.logger.info(f"成功读取 {line_count} 行blendshape数据")
-                return self.data
+        quantized = np.clip((values - low) / self.scale + 0.5, 0, self._Q_MISSING - 1)
+        quantized[missing] = self._Q_MISSING
+        self.values_q = quantized.astype(np.uint8)
+        self.values = None
 
-        except Exception as e:
-            self.logger.error(f"读取文件时发生错误: {str(e)}")
-            import traceback
-            self.logger.error(traceback.format_exc())
-            return None
+    def _dequantize(self, quantized: np.ndarray) -> np.ndarray:
+        """将uint8量化数据还原为float32，缺失值还原为NaN"""
+        values = quantized.astype(np.float32) * np.float32(self.scale) + np.float32(self.offset)
+        values[quantized == self._Q_MISSING] = np.nan
+        return values
 
-    def read_csv_with_info(self, file_path: str) -> Optional[Tuple[List[Dict[str, float]], List[str], List[str]]]:
+    def _load_cache(self, file_path: Path, cache_path: Path, meta_path: Path) -> bool:
+        """尝试从缓存文件加载数据，缓存不存在或过期时返回False"""
+        if not (cache_path.exists() and meta_path.exists()):
+            return False
+
+        csv_mtime = file_path.stat().st_mtime
+        if cache_path.stat().st_mtime < csv_mtime or meta_path.stat().st_mtime < csv_mtime:
+            return False
+
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            column_names = meta['column_names']
+            timestamps = meta['timestamps']
+            values = np.load(cache_path, mmap_mode='r')
+            expected_shape = (len(timestamps), len(column_names) - 2)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.logger.warning("缓存文件无效，将重新解析: %s", e)
+            return False
+
+        if values.shape != expected_shape:
+            self.logger.warning("缓存数据形状 %s 与元数据 %s 不一致，将重新解析", values.shape, expected_shape)
+            return False
+
+        self.column_names = column_names
+        self.timestamps = timestamps
+        self.values = values
+        self.name_to_col = {name: i for i, name in enumerate(self.column_names[2:])}
+        return True
+
+    def _save_cache(self, cache_path: Path, meta_path: Path):
+        """将解析结果写入缓存文件，写入失败不影响本次读取"""
+        try:
+            np.save(cache_path, self.values)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'column_names': self.column_names, 'timestamps': self.timestamps},
+                          f, ensure_ascii=False)
+        except OSError as e:
+            self.logger.warning("写入缓存文件失败: %s", e)
+
+    def read_csv_with_info(self, file_path: str) -> Optional[Tuple[FrameSequence, List[str], List[str]]]:
         """
         读取CSV文件并返回数据、时间戳和列名
 
@@ -109,16 +279,22 @@ class BlendshapeReader:
             file_path: CSV文件路径
 
         Returns:
-            Optional[Tuple]: (数据列表, 时间戳列表, 列名列表) 或 None
+            Optional[Tuple]: (数据序列, 时间戳列表, 列名列表) 或 None
         """
         data = self.read_csv(file_path)
         if data is not None:
             return data, self.timestamps, self.column_names
         return None
 
-    def get_blendshape_data(self) -> List[Dict[str, float]]:
-        """获取blendshape数据"""
-        return self.data
+    def get_blendshape_data(self) -> FrameSequence:
+        """获取blendshape数据，按帧下标访问，每帧为只读的名称到数值映射"""
+        return FrameSequence(self)
+
+    def get_blendshape_array(self) -> np.ndarray:
+        """获取blendshape数据数组，形状为 (帧数, 通道数)，缺失值为NaN；量化模式下返回还原后的副本"""
+        if self.values_q is not None:
+            return self._dequantize(self.values_q)
+        return self.values
 
     def get_timestamps(self) -> List[str]:
         """获取时间戳列表"""
@@ -126,47 +302,59 @@ class BlendshapeReader:
 
     def get_blendshape_names(self) -> List[str]:
         """获取blendshape名称列表"""
-        if self.data:
-            return list(self.data[0].keys())
-        return []
+        return list(self.name_to_col)
 
     def get_frame_count(self) -> int:
         """获取帧数"""
-        return len(self.data)
+        if self.values_q is not None:
+            return self.values_q.shape[0]
+        return self.values.shape[0]
 
     def get_blendshape_value(self, frame_index: int, blendshape_name: str) -> Optional[float]:
         """获取指定帧和blendshape的值"""
-        if 0 <= frame_index < len(self.data):
-            return self.data[frame_index].get(blendshape_name)
+        col = self.name_to_col.get(blendshape_name)
+        if col is not None and 0 <= frame_index < self.get_frame_count():
+            if self.values_q is not None:
+                quantized = int(self.values_q[frame_index, col])
+                if quantized != self._Q_MISSING:
+                    return quantized * self.scale + self.offset
+            else:
+                value = self.values[frame_index, col]
+                if not np.isnan(value):
+                    return float(value)
         return None
 
-    def get_frame_data(self, frame_index: int) -> Optional[Dict[str, float]]:
-        """获取指定帧的所有blendshape数据"""
-        if 0 <= frame_index < len(self.data):
-            return self.data[frame_index]
+    def get_frame_data(self, frame_index: int) -> Optional[FrameView]:
+        """获取指定帧的所有blendshape数据，返回按需取值的只读视图"""
+        if 0 <= frame_index < self.get_frame_count():
+            if self.values_q is not None:
+                # 量化模式下只还原这一帧
+                row = self._dequantize(self.values_q[frame_index:frame_index + 1])
+                return FrameView(row, self.name_to_col, 0)
+            return FrameView(self.values, self.name_to_col, frame_index)
         return None
 
     def get_blendshape_range(self, blendshape_name: str) -> Dict[str, float]:
         """获取指定blendshape在整个动画中的数值范围"""
-        values = []
-        for frame_data in self.data:
-            if blendshape_name in frame_data:
-                values.append(frame_data[blendshape_name])
-
-        if values:
-            return {
-                'min': min(values),
-                'max': max(values),
-                'average': sum(values) / len(values),
-                'count': len(values)
-            }
-        else:
+        col = self.name_to_col.get(blendshape_name)
+        if col is None or not self._counts[col]:
             return {'min': 0, 'max': 0, 'average': 0, 'count': 0}
 
+        return {
+            'min': float(self._mins[col]),
+            'max': float(self._maxs[col]),
+            'average': float(self._means[col]),
+            'count': int(self._counts[col])
+        }
+
     def clear_data(self):
         """清除所有数据"""
-        self.data = []
+        self.values = np.empty((0, 0), dtype=np.float32)
+        self.values_q = None
+        self.scale = 1.0
+        self.offset = 0.0
+        self._reset_stats()
+        self.name_to_col = {}
         self.timestamps = []
         self.column_names = []
         self.logger.info("数据已清除")
-
@@ -1,21 +1,52 @@
 import asyncio
 import websockets
-import json
 import time
 from datetime import datetime
 
+try:
+    import orjson
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+    def _dumps_pretty(obj) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+
+    _loads = orjson.loads
+except ImportError:
+    # orjson 不可用时退回标准库json
+    import json
+
+    # 复用同一个编码器实例；紧凑分隔符与orjson输出一致，也减少帧大小
+    _dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+    def _dumps_pretty(obj) -> str:
+        return json.dumps(obj, indent=2, ensure_ascii=False)
+
+    _loads = json.loads
+
+# 单帧最多合并的消息条数
+SEND_BATCH_LIMIT = 32
+
 
 class WebSocketClient:
-    def __init__(self, uri="ws://192.168.101.102:3100"):
+    def __init__(self, uri="ws://192.168.101.102:3100", verbose=False):
         self.uri = uri
         self.websocket = None
         self.is_connected = False
+        # 为True时打印收到的每条服务器消息
+        self.verbose = verbose
+        # 待发送消息队列，由后台任务统一发送
+        self._send_q = None
+        self._sender_task = None
 
     async def connect(self):
         """连接到WebSocket服务器"""
         try:
             self.websocket = await websockets.connect(self.uri)
             self.is_connected = True
+            self._send_q = asyncio.Queue()
+            self._sender_task = asyncio.create_task(self._sender())
             print(f"成功连接到服务器 {self.uri}")
             return True
         except Exception as e:
@@ -34,20 +65,35 @@ class WebSocketClient:
             **kwargs
         }
 
-        try:
-            await self.websocket.send(json.dumps(message, ensure_ascii=False))
-            print(f"发送消息: {message}")
-            return True
-        except Exception as e:
-            print(f"发送消息失败: {e}")
-            return False
+        self._send_q.put_nowait(message)
+        print(f"发送消息: {message}")
+        return True
+
+    async def _sender(self):
+        """后台发送任务：把队列中积压的消息合并为一帧发送"""
+        while True:
+            batch = [await self._send_q.get()]
+            while not self._send_q.empty() and len(batch) < SEND_BATCH_LIMIT:
+                batch.append(self._send_q.get_nowait())
+
+            # 只有一条时仍按单个对象发送，多条时发送JSON数组
+            payload = batch[0] if len(batch) == 1 else batch
+            try:
+                # 以文本帧发送，与服务器的消息格式保持一致
+                await self.websocket.send(_dumps(payload))
+            except Exception as e:
+                print(f"发送消息失败: {e}")
+            finally:
+                for _ in batch:
+                    self._send_q.task_done()
 
     async def receive_messages(self):
         """接收服务器消息"""
         try:
             async for message in self.websocket:
-                data = json.loads(message)
-                print(f"收到服务器消息: {json.dumps(data, indent=2, ensure_ascii=False)}")
+                data = _loads(message)
+                if self.verbose:
+                    print(f"收到服务器消息: {_dumps_pretty(data)}")
         except websockets.exceptions.ConnectionClosed:
             print("连接已关闭")
             self.is_connected = False
@@ -68,15 +114,25 @@ class WebSocketClient:
 
     async def close(self):
         """关闭连接"""
+        if self._sender_task:
+            # 尽量把已排队的消息发送完再关闭
+            if self.is_connected:
+                try:
+                    await asyncio.wait_for(self._send_q.join(), timeout=5)
+                except asyncio.TimeoutError:
+                    print("仍有消息未发送，放弃发送")
+            self._sender_task.cancel()
+            self._sender_task = None
+
         if self.websocket:
             await self.websocket.close()
             self.is_connected = False
             print("连接已关闭")
 
 
-async def run_test_client():
+async def run_test_client(verbose=False):
     """运行测试客户端"""
-    client = WebSocketClient()
+    client = WebSocketClient(verbose=verbose)
 
     # 连接服务器
     if not await client.connect():
@@ -115,9 +171,9 @@ async def run_test_client():
         await client.close()
 
 
-async def run_simple_client():
+async def run_simple_client(verbose=False):
     """运行简单客户端（长时间运行）"""
-    client = WebSocketClient()
+    client = WebSocketClient(verbose=verbose)
 
     if await client.connect():
         # 启动消息接收
@@ -140,7 +196,11 @@ async def run_simple_client():
 if __name__ == "__main__":
     import sys
 
-    if len(sys.argv) > 1 and sys.argv[1] == "simple":
-        asyncio.run(run_simple_client())
+    # 用法: python client.py [simple] [-v|--verbose]
+    args = sys.argv[1:]
+    verbose = "-v" in args or "--verbose" in args
+
+    if "simple" in args:
+        asyncio.run(run_simple_client(verbose))
     else:
-        asyncio.run(run_test_client())
\ No newline at end of file
+        asyncio.run(run_test_client(verbose))
\ No newline at end of file
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 """gRPC 聊天客户端 - 支持指定服务器地址"""
+import asyncio
 import grpc
 import logging
 import sys
@@ -9,56 +10,94 @@ import argparse
 from generated import chat_pb2
 from generated import chat_pb2_grpc
 
+# 长连接会话使用的通道参数：开启keepalive，放宽接收消息大小限制
+CHANNEL_OPTIONS = [
+    ('grpc.keepalive_time_ms', 30000),
+    ('grpc.keepalive_timeout_ms', 10000),
+    ('grpc.http2.max_pings_without_data', 0),
+    ('grpc.max_receive_message_length', 64 * 1024 * 1024),
+]
+
 
 def send_message(stub, message, user_id=1001):
     """发送消息到服务器"""
-    try:
-        # 创建请求
-        request = chat_pb2.Request(
-            message=message,
-            user_id=user_id
-        )
+    # 创建请求
+    request = chat_pb2.Request(
+        message=message,
+        user_id=user_id
+    )
+    return send_request(stub, request)
 
+
+def send_request(stub, request):
+    """发送已构建好的请求到服务器"""
+    try:
         # 调用 gRPC 方法
         response = stub.SendMessage(request)
-
-        # 处理响应
-        if response.success:
-            print(f"✓ 成功: {response.reply}")
-            print(f"  状态码: {response.code}")
-        else:
-            print(f"✗ 失败: {response.reply}")
-            print(f"  状态码: {response.code}")
-
-        return response.success
+        return print_response(response)
 
     except grpc.RpcError as e:
         print(f"✗ RPC 错误: {e.code()} - {e.details()}")
         return False
 
 
+def print_response(response):
+    """输出响应结果，返回是否成功"""
+    if response.success:
+        print(f"✓ 成功: {response.reply}")
+        print(f"  状态码: {response.code}")
+    else:
+        print(f"✗ 失败: {response.reply}")
+        print(f"  状态码: {response.code}")
+
+    return response.success
+
+
 def test_connection(host, port):
     """测试连接"""
     server_address = f'{host}:{port}'
 
     print(f"尝试连接到服务器: {server_address}")
 
-    channel = grpc.insecure_channel(server_address)
+    channel = grpc.insecure_channel(server_address, options=CHANNEL_OPTIONS)
 
     try:
         # 设置超时
         grpc.channel_ready_future(channel).result(timeout=3)
         return channel, True
     except grpc.FutureTimeoutError:
-        print(f"✗ 无法连接到服务器 {server_address}")
-        print("请确保:")
-        print(f"1. 服务器正在运行 (python server.py)")
-        print(f"2. 地址正确: {host}")
-        print(f"3. 端口正确: {port}")
-        print("4. 防火墙已允许该端口")
+        print_connection_help(host, port)
+        return None, False
+
+
+async def test_connection_async(host, port):
+    """测试连接（grpc.aio 版本）"""
+    server_address = f'{host}:{port}'
+
+    print(f"尝试连接到服务器: {server_address}")
+
+    channel = grpc.aio.insecure_channel(server_address, options=CHANNEL_OPTIONS)
+
+    try:
+        # 设置超时
+        await asyncio.wait_for(channel.channel_ready(), timeout=3)
+        return channel, True
+    except asyncio.TimeoutError:
+        print_connection_help(host, port)
+        await channel.close()
         return None, False
 
 
+def print_connection_help(host, port):
+    """输出连接失败的排查提示"""
+    print(f"✗ 无法连接到服务器 {host}:{port}")
+    print("请确保:")
+    print(f"1. 服务器正在运行 (python server.py)")
+    print(f"2. 地址正确: {host}")
+    print(f"3. 端口正确: {port}")
+    print("4. 防火墙已允许该端口")
+
+
 def run_interactive_mode(host, port):
     """交互式模式"""
     # 测试连接
@@ -119,7 +158,12 @@ def run_interactive_mode(host, port):
 
 def run_test_mode(host, port):
     """测试模式"""
-    channel, connected = test_connection(host, port)
+    asyncio.run(run_test_mode_async(host, port))
+
+
+async def run_test_mode_async(host, port):
+    """测试模式：所有测试用例并发发送，按顺序输出结果"""
+    channel, connected = await test_connection_async(host, port)
     if not connected:
         return
 
@@ -139,12 +183,27 @@ def run_test_mode(host, port):
         ("Hello from Python gRPC client!", 1006, True),
     ]
 
-    for i, (message, user_id, should_succeed) in enumerate(test_cases, 1):
+    # 预先构建所有请求，发送循环中只做RPC调用
+    requests = [chat_pb2.Request(message=message, user_id=user_id)
+                for message, user_id, _ in test_cases]
+
+    # 各用例相互独立，并发发出以重叠网络往返时间
+    results = await asyncio.gather(*[stub.SendMessage(request) for request in requests],
+                                   return_exceptions=True)
+    await channel.close()
+
+    for i, ((message, user_id, should_succeed), result) in enumerate(zip(test_cases, results), 1):
         print(f"\n测试 {i}/{len(test_cases)}")
         print(f"消息: '{message}'")
         print(f"用户ID: {user_id}")
 
-        success = send_message(stub, message, user_id)
+        if isinstance(result, grpc.RpcError):
+            print(f"✗ RPC 错误: {result.code()} - {result.details()}")
+            success = False
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            success = print_response(result)
 
         if success == should_succeed:
             print("✓ 测试通过")
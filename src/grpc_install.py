@@ -14,13 +14,16 @@ def install_requirements():
 
     print("安装 gRPC 依赖...")
 
+    # 一次pip调用安装全部依赖，只启动一次pip并只做一次依赖解析
+    try:
+        subprocess.check_call([sys.executable, "-m", "pip", "install",
+                               "--disable-pip-version-check", "--no-input", *requirements])
+    except subprocess.CalledProcessError:
+        print(f"✗ 安装失败: {', '.join(requirements)}")
+        return False
+
     for package in requirements:
-        try:
-            subprocess.check_call([sys.executable, "-m", "pip", "install", package])
-            print(f"✓ 已安装 {package}")
-        except subprocess.CalledProcessError:
-            print(f"✗ 安装 {package} 失败")
-            return False
+        print(f"✓ 已安装 {package}")
 
     return True
 
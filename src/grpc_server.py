@@ -3,15 +3,36 @@
 import grpc
 import logging
 import socket
+import functools
 from concurrent import futures
-import time
 import os
+import multiprocessing
 import sys  # 添加这行
 
 # 导入生成的代码
 from generated import chat_pb2
 from generated import chat_pb2_grpc
 
+# 服务进程数，可通过环境变量 GRPC_PROCESSES 覆盖；多个进程借助SO_REUSEPORT
+# 监听同一端口，由内核在进程间分配连接。该负载均衡仅在Linux上有效，
+# 因此默认只在Linux上按CPU核数启动多进程，其他平台默认单进程
+GRPC_PROCESSES = int(os.environ.get(
+    "GRPC_PROCESSES", (os.cpu_count() or 1) if sys.platform.startswith("linux") else 1))
+
+# 每个进程的工作线程数，可通过环境变量 GRPC_WORKERS 覆盖；默认总线程数为CPU核数的2倍，
+# 多进程时由各进程均分（每个进程至少2个）
+GRPC_WORKERS = int(os.environ.get(
+    "GRPC_WORKERS", max(2, (os.cpu_count() or 4) * 2 // max(GRPC_PROCESSES, 1))))
+
+SERVER_OPTIONS = [
+    ('grpc.so_reuseport', 1),
+    ('grpc.max_concurrent_streams', 1000),
+    ('grpc.keepalive_time_ms', 30000),
+]
+
+# 主机名在进程生命周期内不变，导入时获取一次
+_HOSTNAME = socket.gethostname()
+
 
 class ChatService(chat_pb2_grpc.ChatServiceServicer):
     """ChatService 实现类"""
@@ -27,10 +48,10 @@ class ChatService(chat_pb2_grpc.ChatServiceServicer):
             # 获取客户端地址
             peer = context.peer()
             client_info = f"来自 {peer}"
-        except:
+        except Exception:
             client_info = "客户端地址未知"
 
-        logging.info(f"收到{client_info}的消息 - 用户ID: {user_id}, 消息: '{message}'")
+        logging.info("收到%s的消息 - 用户ID: %s, 消息: '%s'", client_info, user_id, message)
 
         # 构建响应
         if message:
@@ -49,67 +70,63 @@ class ChatService(chat_pb2_grpc.ChatServiceServicer):
         )
 
 
+@functools.lru_cache(maxsize=1)
 def get_local_ip():
-    """获取本机IP地址"""
-    ip_addresses = []
+    """获取本机IP地址，结果在进程内缓存"""
+    # 集合负责去重，列表保持发现顺序
+    seen = set()
+    ordered = []
 
-    try:
-        # 方法1: 通过socket获取所有IP
-        hostname = socket.gethostname()
+    def add_ip(ip):
+        # 插入时即过滤本地回环地址和重复项
+        if ip not in seen and not ip.startswith("127."):
+            seen.add(ip)
+            ordered.append(ip)
 
-        # 获取主机名对应的所有IP
+    try:
+        # 方法1: 通过socket获取主机名对应的所有IP
         try:
-            all_ips = socket.gethostbyname_ex(hostname)[2]
-            ip_addresses.extend(all_ips)
-        except:
+            for ip in socket.gethostbyname_ex(_HOSTNAME)[2]:
+                add_ip(ip)
+        except OSError:
             pass
 
         # 方法2: 通过创建临时socket获取
         try:
             # 连接到外部服务器但不发送数据
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.settimeout(0.1)
-            # 连接到公共DNS服务器
-            s.connect(("8.8.8.8", 80))
-            local_ip = s.getsockname()[0]
-            s.close()
-            if local_ip not in ip_addresses and local_ip != "127.0.0.1":
-                ip_addresses.append(local_ip)
-        except:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+                s.settimeout(0.05)
+                # 连接到公共DNS服务器
+                s.connect(("8.8.8.8", 80))
+                local_ip = s.getsockname()[0]
+            add_ip(local_ip)
+        except OSError:
             pass
 
-        # 方法3: 获取网络接口信息（可选）
+        # 方法3: 获取网络接口信息（可选），net_if_addrs一次返回所有接口的地址
         try:
-            import netifaces
-            for interface in netifaces.interfaces():
-                addrs = netifaces.ifaddresses(interface)
-                if netifaces.AF_INET in addrs:
-                    for addr in addrs[netifaces.AF_INET]:
-                        ip = addr['addr']
-                        if ip not in ip_addresses and ip != "127.0.0.1":
-                            ip_addresses.append(ip)
+            import psutil
+            for addrs in psutil.net_if_addrs().values():
+                for addr in addrs:
+                    if addr.family == socket.AF_INET:
+                        add_ip(addr.address)
         except ImportError:
-            # netifaces 模块不可用，跳过
+            # psutil 模块不可用，跳过
             pass
 
     except Exception as e:
-        logging.warning(f"获取IP地址时出错: {e}")
+        logging.warning("获取IP地址时出错: %s", e)
 
-    # 如果没有找到非回环地址，使用localhost
-    if not ip_addresses:
-        ip_addresses.append("127.0.0.1")
+    # 如果没有网络IP，至少保留一个本地地址
+    if not ordered:
+        ordered.append("127.0.0.1")
 
-    # 过滤掉本地回环地址和重复项
-    unique_ips = []
-    for ip in ip_addresses:
-        if ip not in unique_ips and not ip.startswith("127."):
-            unique_ips.append(ip)
+    return tuple(ordered)
 
-    # 如果没有网络IP，至少保留一个本地地址
-    if not unique_ips:
-        unique_ips.append("127.0.0.1")
 
-    return unique_ips
+def invalidate_ip_cache():
+    """网络配置变化后清空IP缓存"""
+    get_local_ip.cache_clear()
 
 
 def display_server_info(port):
@@ -149,22 +166,21 @@ def display_server_info(port):
     print("=" * 60 + "\n")
 
 
-def serve():
-    """启动 gRPC 服务器"""
-    # 配置日志
+def _configure_logging():
+    """配置日志，子进程中重复调用不会覆盖已有配置"""
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
 
-    # 监听端口
-    port = 50051
 
-    # 显示服务器信息
-    display_server_info(port)
+def serve_one(port):
+    """在当前进程中启动一个 gRPC 服务器实例"""
+    _configure_logging()
 
     # 创建服务器
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    executor = futures.ThreadPoolExecutor(max_workers=GRPC_WORKERS, thread_name_prefix="grpc-srv")
+    server = grpc.server(executor, options=SERVER_OPTIONS)
 
     # 注册服务
     chat_pb2_grpc.add_ChatServiceServicer_to_server(ChatService(), server)
@@ -174,20 +190,52 @@ def serve():
 
     # 启动服务器
     server.start()
-    logging.info(f"gRPC 服务器已启动，正在监听端口 {port}")
+    logging.info("gRPC 服务器已启动 (PID %s)，正在监听端口 %s，工作线程数: %s", os.getpid(), port, GRPC_WORKERS)
     logging.info("按 Ctrl+C 停止服务器")
 
     try:
-        # 保持服务器运行
-        while True:
-            time.sleep(1)
+        # 阻塞等待服务器终止，无需轮询唤醒
+        server.wait_for_termination()
     except KeyboardInterrupt:
         print("\n" + "=" * 60)
         logging.info("正在关闭服务器...")
-        server.stop(0)
+        # 给进行中的请求最多5秒完成
+        server.stop(grace=5).wait()
         logging.info("服务器已安全关闭")
         print("=" * 60)
 
 
+def serve():
+    """启动 gRPC 服务器，GRPC_PROCESSES 大于1时启动多个进程共享同一端口"""
+    # 配置日志
+    _configure_logging()
+
+    # 监听端口
+    port = 50051
+
+    # 显示服务器信息（只在父进程中显示一次）
+    display_server_info(port)
+
+    if GRPC_PROCESSES <= 1:
+        serve_one(port)
+        return
+
+    logging.info("启动 %s 个服务进程", GRPC_PROCESSES)
+    workers = [
+        multiprocessing.Process(target=serve_one, args=(port,), name=f"grpc-srv-{i}")
+        for i in range(GRPC_PROCESSES)
+    ]
+    for worker in workers:
+        worker.start()
+
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        # Ctrl+C 同时会发送给子进程，等待它们各自完成关闭
+        for worker in workers:
+            worker.join()
+
+
 if __name__ == '__main__':
     serve()
\ No newline at end of file
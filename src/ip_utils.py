@@ -1,36 +1,78 @@
+import functools
 import socket
-from typing import List
+import struct
+from typing import Tuple
 import logging
 
 logger = logging.getLogger("IPUtils")
 
+# 主机名在进程生命周期内不变，导入时获取一次
+_HOSTNAME = socket.gethostname()
 
-def get_local_ipv4_addresses() -> List[str]:
+
+@functools.lru_cache(maxsize=1)
+def get_local_ipv4_addresses() -> Tuple[str, ...]:
     """
     简化版：获取本机IPv4地址
+    本机IP在进程生命周期内基本不变，结果缓存后不再重复发起socket系统调用
     """
     ipv4_addresses = []
 
     try:
         # 方法1: 通过外部连接获取IP（最可靠）
         with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            # 没有默认路由时快速失败，不等待系统默认超时
+            s.settimeout(0.05)
             s.connect(("8.8.8.8", 80))
             local_ip = s.getsockname()[0]
             if local_ip != '127.0.0.1':
                 ipv4_addresses.append(local_ip)
-    except:
+    except OSError:
         pass
 
     try:
         # 方法2: 获取主机名对应的IP
-        hostname = socket.gethostname()
-        local_ip = socket.gethostbyname(hostname)
+        local_ip = socket.gethostbyname(_HOSTNAME)
         if local_ip != '127.0.0.1' and local_ip not in ipv4_addresses:
             ipv4_addresses.append(local_ip)
-    except:
+    except OSError:
         pass
 
-    return ipv4_addresses
+    return tuple(ipv4_addresses)
+
+
+def invalidate_ip_cache():
+    """网络配置变化后清空IP缓存，下次调用时重新探测"""
+    get_local_ipv4_addresses.cache_clear()
+
+
+# 局域网网段：(掩码, 网络地址, 类型说明)
+_PRIVATE_RANGES = (
+    (0xFFFF0000, 0xC0A80000, "局域网IP (192.168.x.x)"),  # 192.168.0.0/16
+    (0xFF000000, 0x0A000000, "局域网IP (10.x.x.x)"),  # 10.0.0.0/8
+    (0xFFF00000, 0xAC100000, "局域网IP (172.16.x.x-172.31.x.x)"),  # 172.16.0.0/12
+)
+_PUBLIC_IP = "公网IP"
+
+
+def classify_ip(ip: str) -> str:
+    """
+    判断IPv4地址类型：转换为32位整数后按网段掩码比较
+    """
+    try:
+        ip_int = struct.unpack("!I", socket.inet_aton(ip))[0]
+    except OSError:
+        return _PUBLIC_IP
+
+    for mask, network, ip_type in _PRIVATE_RANGES:
+        if ip_int & mask == network:
+            return ip_type
+    return _PUBLIC_IP
+
+
+def is_lan_ip(ip: str) -> bool:
+    """是否为局域网IP"""
+    return classify_ip(ip) != _PUBLIC_IP
 
 
 def log_network_info(port: int):
@@ -39,8 +81,7 @@ def log_network_info(port: int):
     """
     logger.info("=== 服务器网络信息 ===")
 
-    hostname = socket.gethostname()
-    logger.info(f"主机名: {hostname}")
+    logger.info("主机名: %s", _HOSTNAME)
 
     ipv4_addresses = get_local_ipv4_addresses()
 
@@ -49,21 +90,13 @@ def log_network_info(port: int):
     else:
         logger.info("本机IPv4地址列表:")
         for ip in ipv4_addresses:
-            if ip.startswith('192.168.'):
-                ip_type = "局域网IP (192.168.x.x)"
-            elif ip.startswith('10.'):
-                ip_type = "局域网IP (10.x.x.x)"
-            elif ip.startswith('172.16.') or (ip.startswith('172.') and
-                                              16 <= int(ip.split('.')[1]) <= 31):
-                ip_type = "局域网IP (172.16.x.x-172.31.x.x)"
-            else:
-                ip_type = "公网IP"
-            logger.info(f"  - {ip} ({ip_type})")
+            ip_type = classify_ip(ip)
+            logger.info("  - %s (%s)", ip, ip_type)
 
         # 显示访问地址
         logger.info("可访问地址:")
         for ip in ipv4_addresses:
-            logger.info(f"  - ws://{ip}:{port}")
+            logger.info("  - ws://%s:%s", ip, port)
 
-    logger.info(f"本地回环地址: ws://127.0.0.1:{port}")
+    logger.info("本地回环地址: ws://127.0.0.1:%s", port)
     logger.info("===")
\ No newline at end of file
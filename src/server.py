@@ -1,47 +1,93 @@
 import asyncio
 import websockets
-import json
-from datetime import datetime
+from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
+from time import monotonic, time_ns
 import logging
 import socket
-from typing import List, Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+import os
 import random
+import sys
 
-# 设置日志格式，包含具体时间（精确到毫秒）
+from ip_utils import classify_ip, get_local_ipv4_addresses, invalidate_ip_cache, is_lan_ip
+
+try:
+    # uvloop 可选，可用时替换默认事件循环
+    import uvloop
+except ImportError:
+    uvloop = None
+
+try:
+    import orjson
+
+    def _dumps(obj) -> str:
+        """序列化为JSON文本帧，orjson默认输出UTF-8且不转义中文"""
+        return orjson.dumps(obj).decode()
+
+    _loads = orjson.loads
+    _JSONDecodeError = orjson.JSONDecodeError
+except ImportError:
+    # orjson 不可用时退回标准库json，复用同一个编码器实例
+    import json
+
+    _dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    _loads = json.loads
+    _JSONDecodeError = json.JSONDecodeError
+
+# 设置日志格式，包含具体时间（精确到毫秒）；级别可通过环境变量 LOG_LEVEL 调整，
+# 生产环境可设为WARNING
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.environ.get("LOG_LEVEL", "INFO").upper(),
     format='%(asctime)s.%(msecs)03d - %(name)s - %(levelname)s - %(message)s',
     datefmt='%Y-%m-%d %H:%M:%S'
 )
 logger = logging.getLogger("WebSocketServer")
 
-
-def get_local_ipv4_addresses() -> List[str]:
+# 主机名在进程生命周期内不变，导入时获取一次
+_HOSTNAME = socket.gethostname()
+
+# 最大同时连接数，超出时以1013（Try Again Later）关闭新连接
+MAX_CLIENTS = 10_000
+
+# 单帧JSON数组最多包含的消息条数，与客户端的SEND_BATCH_LIMIT一致，超出时整帧拒绝
+MAX_BATCH_MESSAGES = 32
+
+# 两次进度发送之间的最小间隔（秒）
+PROGRESS_SEND_INTERVAL = 0.1
+
+# 本机IP缓存的有效期（秒）
+IP_CACHE_TTL = 60
+
+# 单个连接写缓冲区超过该字节数时视为背压，跳过非必要的消息
+WRITE_BUFFER_LIMIT = 64 * 1024
+
+# 固定结构消息的文本帧模板，只替换变化的字段；
+# actionGroupID来自客户端输入，必须先经过_dumps编码再填入
+_PROGRESS_TMPL = '{"type":"progress","data":{"value":%.2f,"message":"播放中","actionGroupID":%s},"timestamp":%d}'
+_END_TMPL = '{"type":"actionEnd","data":{"value":100.0,"message":"播放完成","actionGroupID":%s},"timestamp":%d}'
+_WELCOME_TMPL = ('{"type":"welcome","data":{"status":"connected",'
+                 '"message":"Hello %d, welcome to WebSocket Server!"},"timestamp":%d}')
+_START_ACK_TMPL = ('{"type":"actionStartAck","data":{"status":"started","message":"播放已开始",'
+                   '"actionGroupID":%s},"timestamp":%d}')
+_STOP_ACK_TMPL = ('{"type":"actionStopAck","data":{"status":"stopped","message":"播放已停止",'
+                  '"actionGroupID":%s},"timestamp":%d}')
+_ACK_TMPL = '{"type":"ack","data":{"status":%s,"message":%s},"timestamp":%d}'
+_RESET_ACK_TMPL = ('{"type":"actionResetAck","data":{"status":"reset","message":"所有播放已停止并重置",'
+                   '"actionGroupID":0},"timestamp":%d}')
+_HEARTBEAT_ACK_TMPL = '{"type":"heartbeatAck","data":{"status":"alive","message":"服务器运行正常"},"timestamp":%d}'
+_PARSE_ERROR_ACK_TMPL = '{"type":"ack","data":{"status":"error","message":"无效的JSON格式，消息解析失败"},"timestamp":%d}'
+_PARSE_ERROR_TMPL = '{"type":"error","data":{"message":"无效的JSON格式","original_message":%s},"timestamp":%d}'
+_ECHO_TMPL = '{"type":"echo_response","data":{"original_message":%s,"server_note":"这是回声测试的响应"},"timestamp":%d}'
+_MISSING_AID_TMPL = '{"type":"error","data":{"message":"缺少actionGroupID参数","actionGroupID":null},"timestamp":%d}'
+_BATCH_TOO_LARGE_TMPL = ('{"type":"error","data":{"message":"批量消息过多","count":%d,'
+                         '"limit":%d},"timestamp":%d}')
+
+
+async def aget_local_ipv4_addresses() -> Tuple[str, ...]:
     """
-    获取本机IPv4地址
+    在线程池中获取本机IPv4地址，避免阻塞的socket调用占用事件循环
     """
-    ipv4_addresses = []
-
-    try:
-        # 方法1: 通过外部连接获取IP（最可靠）
-        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
-            s.connect(("8.8.8.8", 80))
-            local_ip = s.getsockname()[0]
-            if local_ip != '127.0.0.1':
-                ipv4_addresses.append(local_ip)
-    except:
-        pass
-
-    try:
-        # 方法2: 获取主机名对应的IP
-        hostname = socket.gethostname()
-        local_ip = socket.gethostbyname(hostname)
-        if local_ip != '127.0.0.1' and local_ip not in ipv4_addresses:
-            ipv4_addresses.append(local_ip)
-    except:
-        pass
-
-    return ipv4_addresses
+    return await asyncio.to_thread(get_local_ipv4_addresses)
 
 
 def choose_best_ip() -> str:
@@ -55,396 +101,392 @@ def choose_best_ip() -> str:
 
     # 优先选择局域网IP
     for ip in ips:
-        if ip.startswith('192.168.') or ip.startswith('10.') or \
-                (ip.startswith('172.') and 16 <= int(ip.split('.')[1]) <= 31):
+        if is_lan_ip(ip):
             return ip
 
     # 如果没有局域网IP，返回第一个IP
     return ips[0]
 
 
+def _writable(websocket, limit: int = WRITE_BUFFER_LIMIT) -> bool:
+    """
+    连接的写缓冲区未积压时返回True，慢客户端的待发送数据不会无限增长
+    """
+    transport = websocket.transport
+    return transport is None or transport.get_write_buffer_size() < limit
+
+
 class WebSocketServer:
     def __init__(self, host=None, port=3100):
         # 如果未指定host，自动选择最佳IP
         self.host = host if host else choose_best_ip()
         self.port = port
-        self.connected_clients = set()
-        # 存储每个客户端的播放状态和任务
-        self.client_playback_tasks: Dict[int, Dict] = {}  # client_id -> {actionGroupID: task}
-        self.client_current_playing: Dict[int, Optional[int]] = {}  # client_id -> current_playing_actionGroupID
+        self._clients: Dict[int, Any] = {}  # client_id -> websocket
+        # 服务器独享的随机数生成器，生成播放进度的步数和间隔
+        self._rng = random.Random()
+        # 客户端ID自增分配；id(websocket)在对象回收后可能被新连接复用
+        self._next_cid = 0
+        # 本机IP缓存，choose_best_ip刚刚探测过，这里直接命中lru_cache
+        self._cached_ips = get_local_ipv4_addresses()
+        self._ips_cached_at = monotonic()
+        self._ips_refresh: Optional[asyncio.Task] = None
+        # 存储所有播放任务，停止播放直接取消对应任务
+        self._tasks: Dict[Tuple[int, Any], asyncio.Task] = {}  # (client_id, actionGroupID) -> task
+        self._current: Dict[int, Optional[int]] = {}  # client_id -> current_playing_actionGroupID
+        # 每个客户端拥有的actionGroupID索引，停止/断开时无需遍历全部任务
+        self._client_aids: Dict[int, Set[Any]] = {}  # client_id -> {actionGroupID}
+        # 消息类型 -> 处理方法
+        self._handlers: Dict[str, Callable[..., Awaitable[None]]] = {
+            "actionStart": self._h_start,
+            "actionStop": self._h_stop,
+            "actionReset": self._h_reset,
+            "echo": self._h_echo,
+            "broadcast": self._h_broadcast,
+            "get_server_info": self._h_info,
+            "heartbeat": self._h_heartbeat,
+        }
+
+    def _get_ips(self, ttl: float = IP_CACHE_TTL) -> Tuple[str, ...]:
+        """
+        返回缓存的本机IP；缓存超过ttl秒时在后台线程重新探测，本次仍返回旧值，
+        get_server_info 不会等待socket调用
+        """
+        if monotonic() - self._ips_cached_at > ttl and self._ips_refresh is None:
+            self._ips_refresh = asyncio.create_task(self._refresh_ips())
+        return self._cached_ips
+
+    async def _refresh_ips(self):
+        """在线程中重新探测本机IP并更新缓存，同一时间只有一个刷新任务"""
+        try:
+            invalidate_ip_cache()
+            self._cached_ips = await aget_local_ipv4_addresses()
+            self._ips_cached_at = monotonic()
+        finally:
+            self._ips_refresh = None
+
+    @staticmethod
+    def _now_ms() -> int:
+        """当前Unix时间戳（毫秒）"""
+        return time_ns() // 1_000_000
 
     async def send_ack(self, websocket, original_message, status="processed"):
         """发送ack确认消息"""
-        ack_msg = {
-            "type": "ack",
-            "data": {
-                "status": status,
-                "message": f"接收到的消息 '{original_message}' 处理成功"
-            },
-            "timestamp": int(datetime.now().timestamp() * 1000)
-        }
-        await websocket.send(json.dumps(ack_msg, ensure_ascii=False))
+        message = _dumps(f"接收到的消息 '{original_message}' 处理成功")
+        await websocket.send(_ACK_TMPL % (_dumps(status), message, self._now_ms()))
 
     async def simulate_playback(self, websocket, client_id, action_group_id):
-        """模拟播放进度"""
-        logger.info(f"开始为客户端 {client_id} 模拟播放，actionGroupID: {action_group_id}")
-
-        # 发送播放进度消息（5-10次随机进度更新）
-        progress_steps = random.randint(5, 10)
-        for i in range(progress_steps):
-            # 检查是否还在播放状态（通过检查任务是否还存在）
-            if (client_id not in self.client_playback_tasks or
-                    action_group_id not in self.client_playback_tasks[client_id]):
-                logger.info(f"播放被停止，actionGroupID: {action_group_id}")
-                return
+        """模拟播放进度，被actionStop/actionReset中断时任务会被取消"""
+        logger.info("开始为客户端 %s 模拟播放，actionGroupID: %s", client_id, action_group_id)
 
-            progress_value = min(100.0, float((i + 1) * 100.0 / progress_steps))
+        # actionGroupID在整个任务中不变，只编码一次
+        aid_json = _dumps(action_group_id)
 
-            # 发送播放进度消息
-            progress_msg = {
-                "type": "progress",
-                "data": {
-                    "value": progress_value,  # 改为浮点数
-                    "message": "播放中",
-                    "actionGroupID": action_group_id
-                },
-                "timestamp": int(datetime.now().timestamp() * 1000)
-            }
+        # 进度消息经容量为1的队列交给发送协程：客户端来不及接收时只保留最新进度
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        sender = asyncio.create_task(self._send_progress(websocket, client_id, action_group_id, queue))
 
-            try:
-                await websocket.send(json.dumps(progress_msg, ensure_ascii=False))
-                logger.info(
-                    f"向客户端 {client_id} 发送播放进度: {progress_value:.2f}%, actionGroupID: {action_group_id}")
-            except:
-                logger.error(f"向客户端 {client_id} 发送消息失败")
-                break
+        try:
+            # 产生播放进度消息（5-10次随机进度更新），每次间隔随机0.5-2秒，开始前一次生成
+            rng = self._rng
+            progress_steps = rng.randint(5, 10)
+            delays = [rng.uniform(0.5, 2.0) for _ in range(progress_steps)]
+            for i, delay in enumerate(delays):
+                if sender.done():
+                    # 发送失败，停止产生进度
+                    break
 
-            # 随机延迟0.5-2秒
-            await asyncio.sleep(random.uniform(0.5, 2.0))
+                progress_value = min(100.0, float((i + 1) * 100.0 / progress_steps))
 
-        # 检查是否还在播放状态（可能被actionStop或actionReset中断）
-        if (client_id in self.client_playback_tasks and
-                action_group_id in self.client_playback_tasks[client_id]):
+                # 进度帧是最热的路径，直接用模板拼接
+                progress_msg = _PROGRESS_TMPL % (progress_value, aid_json, self._now_ms())
 
-            # 发送播放结束消息
-            end_msg = {
-                "type": "actionEnd",
-                "data": {
-                    "value": 100.0,  # 改为浮点数
-                    "message": "播放完成",
-                    "actionGroupID": action_group_id
-                },
-                "timestamp": int(datetime.now().timestamp() * 1000)
-            }
+                # 队列已满说明上一条还没发出，丢弃旧进度
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait((progress_value, progress_msg))
 
+                await asyncio.sleep(delay)
+
+            # 等待剩余进度发送完毕
+            if not sender.done():
+                await queue.put(None)
+            await sender
+
+            # 发送播放结束消息
             try:
-                await websocket.send(json.dumps(end_msg, ensure_ascii=False))
-                logger.info(f"向客户端 {client_id} 发送播放结束通知，actionGroupID: {action_group_id}")
-            except:
-                logger.error(f"向客户端 {client_id} 发送结束消息失败")
+                await websocket.send(_END_TMPL % (aid_json, self._now_ms()))
+                logger.info("向客户端 %s 发送播放结束通知，actionGroupID: %s", client_id, action_group_id)
+            except websockets.exceptions.ConnectionClosed:
+                logger.error("向客户端 %s 发送结束消息失败", client_id)
 
             # 清理播放状态
             self._cleanup_playback_task(client_id, action_group_id)
 
-    def _cleanup_playback_task(self, client_id: int, action_group_id: int):
+        except asyncio.CancelledError:
+            logger.info("播放被停止，actionGroupID: %s", action_group_id)
+            raise
+        finally:
+            sender.cancel()
+
+    async def _send_progress(self, websocket, client_id, action_group_id, queue: asyncio.Queue):
+        """从队列中取出进度消息逐条发送，两次发送之间至少间隔PROGRESS_SEND_INTERVAL"""
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            progress_value, progress_msg = item
+
+            if not _writable(websocket):
+                # 客户端来不及接收，跳过这次中间进度；actionEnd总会发送
+                logger.debug("客户端 %s 写缓冲区积压，跳过进度 %.2f%%", client_id, progress_value)
+                continue
+
+            try:
+                await websocket.send(progress_msg)
+                # 每个进度帧都会触发，只在DEBUG级别输出
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("向客户端 %s 发送播放进度: %.2f%%, actionGroupID: %s",
+                                 client_id, progress_value, action_group_id)
+            except websockets.exceptions.ConnectionClosed:
+                logger.error("向客户端 %s 发送消息失败", client_id)
+                return
+
+            await asyncio.sleep(PROGRESS_SEND_INTERVAL)
+
+    def _cleanup_playback_task(self, client_id: int, action_group_id):
         """清理播放任务"""
-        if client_id in self.client_playback_tasks:
-            if action_group_id in self.client_playback_tasks[client_id]:
-                # 取消任务（如果还在运行）
-                task = self.client_playback_tasks[client_id][action_group_id]
-                if not task.done():
-                    task.cancel()
-                del self.client_playback_tasks[client_id][action_group_id]
+        task = self._tasks.pop((client_id, action_group_id), None)
+        # 取消任务（如果还在运行）；任务自己结束时调用不能取消自身
+        if task is not None and task is not asyncio.current_task() and not task.done():
+            task.cancel()
 
-            # 如果该客户端没有其他任务了，清理整个客户端的记录
-            if not self.client_playback_tasks[client_id]:
-                del self.client_playback_tasks[client_id]
+        aids = self._client_aids.get(client_id)
+        if aids is not None:
+            aids.discard(action_group_id)
 
         # 更新当前播放状态
-        if (client_id in self.client_current_playing and
-                self.client_current_playing[client_id] == action_group_id):
-            self.client_current_playing[client_id] = None
+        if self._current.get(client_id) == action_group_id:
+            self._current[client_id] = None
 
     async def _stop_all_playback(self, client_id: int, websocket):
         """停止客户端的所有播放任务"""
-        if client_id not in self.client_playback_tasks:
-            return
-
         # 复制keys避免在迭代时修改字典
-        action_group_ids = list(self.client_playback_tasks[client_id].keys())
+        action_group_ids = list(self._client_aids.get(client_id, ()))
 
         for action_group_id in action_group_ids:
             self._cleanup_playback_task(client_id, action_group_id)
-            logger.info(f"客户端 {client_id} 停止播放，actionGroupID: {action_group_id}")
+            logger.info("客户端 %s 停止播放，actionGroupID: %s", client_id, action_group_id)
 
         # 发送重置确认
-        reset_ack = {
-            "type": "actionResetAck",
-            "data": {
-                "status": "reset",
-                "message": "所有播放已停止并重置",
-                "actionGroupID": 0
-            },
-            "timestamp": int(datetime.now().timestamp() * 1000)
-        }
-        await websocket.send(json.dumps(reset_ack, ensure_ascii=False))
+        await websocket.send(_RESET_ACK_TMPL % self._now_ms())
 
     async def handle_client(self, websocket):
         """处理客户端连接"""
-        client_id = id(websocket)
-        self.connected_clients.add(websocket)
+        client_id = self._next_cid
+        self._next_cid += 1
+        if len(self._clients) >= MAX_CLIENTS:
+            logger.warning("连接数已达上限 %s，拒绝客户端 %s", MAX_CLIENTS, client_id)
+            await websocket.close(code=1013, reason="server full")
+            return
+
+        self._clients[client_id] = websocket
         # 初始化客户端的播放状态
-        self.client_playback_tasks[client_id] = {}
-        self.client_current_playing[client_id] = None
-        logger.info(f"客户端 {client_id} 已连接，当前连接数: {len(self.connected_clients)}")
+        self._current[client_id] = None
+        self._client_aids[client_id] = set()
+        logger.info("客户端 %s 已连接，当前连接数: %s", client_id, len(self._clients))
 
         try:
             # 发送欢迎消息
-            welcome_msg = {
-                "type": "welcome",
-                "data": {
-                    "status": "connected",
-                    "message": f"Hello {client_id}, welcome to WebSocket Server!"
-                },
-                "timestamp": int(datetime.now().timestamp() * 1000)
-            }
-            await websocket.send(json.dumps(welcome_msg, ensure_ascii=False))
+            await websocket.send(_WELCOME_TMPL % (client_id, self._now_ms()))
 
             # 处理客户端消息
             async for message in websocket:
                 await self.process_message(websocket, message, client_id)
 
         except websockets.exceptions.ConnectionClosed:
-            logger.info(f"客户端 {client_id} 断开连接")
+            logger.info("客户端 %s 断开连接", client_id)
         except Exception as e:
-            logger.error(f"处理客户端 {client_id} 时发生错误: {e}")
+            logger.error("处理客户端 %s 时发生错误: %s", client_id, e)
         finally:
-            # 清理客户端状态
-            if client_id in self.client_playback_tasks:
-                # 取消所有正在运行的任务
-                for action_group_id, task in self.client_playback_tasks[client_id].items():
-                    if not task.done():
-                        task.cancel()
-                del self.client_playback_tasks[client_id]
+            # 清理客户端状态，取消该客户端所有正在运行的任务
+            for action_group_id in self._client_aids.pop(client_id, ()):
+                task = self._tasks.pop((client_id, action_group_id), None)
+                if task is not None:
+                    task.cancel()
 
-            if client_id in self.client_current_playing:
-                del self.client_current_playing[client_id]
+            self._current.pop(client_id, None)
 
-            if websocket in self.connected_clients:
-                self.connected_clients.remove(websocket)
-            logger.info(f"客户端 {client_id} 已移除，当前连接数: {len(self.connected_clients)}")
+            self._clients.pop(client_id, None)
+            logger.info("客户端 %s 已移除，当前连接数: %s", client_id, len(self._clients))
 
     async def process_message(self, websocket, message, client_id):
         """处理接收到的消息"""
         try:
-            data = json.loads(message)
-            logger.info(f"收到来自客户端 {client_id} 的消息: {data}")
-
-            # 首先发送ack确认消息
-            original_message = data.get('message', str(data))
-            await self.send_ack(websocket, original_message)
-
-            # 根据消息类型处理
-            msg_type = data.get('type', 'unknown')
-            action_group_id = data.get('actionGroupID')
-
-            if msg_type == 'actionStart':
-                # 开始播放
-                if not action_group_id:
-                    error_msg = {
-                        "type": "error",
-                        "data": {
-                            "message": "缺少actionGroupID参数",
-                            "actionGroupID": None
-                        },
-                        "timestamp": int(datetime.now().timestamp() * 1000)
-                    }
-                    await websocket.send(json.dumps(error_msg, ensure_ascii=False))
-                    return
-
-                # 如果已经有播放任务在运行，先停止之前的
-                if (client_id in self.client_current_playing and
-                        self.client_current_playing[client_id] is not None):
-                    current_playing_id = self.client_current_playing[client_id]
-                    if current_playing_id in self.client_playback_tasks.get(client_id, {}):
-                        self._cleanup_playback_task(client_id, current_playing_id)
-                        logger.info(f"停止之前的播放任务，actionGroupID: {current_playing_id}")
-
-                # 创建新的播放任务
-                task = asyncio.create_task(self.simulate_playback(websocket, client_id, action_group_id))
-
-                # 存储任务引用
-                if client_id not in self.client_playback_tasks:
-                    self.client_playback_tasks[client_id] = {}
-                self.client_playback_tasks[client_id][action_group_id] = task
-                self.client_current_playing[client_id] = action_group_id
-
-                # 发送开始确认
-                start_ack = {
-                    "type": "actionStartAck",
-                    "data": {
-                        "status": "started",
-                        "message": "播放已开始",
-                        "actionGroupID": action_group_id
-                    },
-                    "timestamp": int(datetime.now().timestamp() * 1000)
-                }
-                await websocket.send(json.dumps(start_ack, ensure_ascii=False))
-
-            elif msg_type == 'actionStop':
-                # 停止播放
-                if not action_group_id:
-                    error_msg = {
-                        "type": "error",
-                        "data": {
-                            "message": "缺少actionGroupID参数",
-                            "actionGroupID": None
-                        },
-                        "timestamp": int(datetime.now().timestamp() * 1000)
-                    }
-                    await websocket.send(json.dumps(error_msg, ensure_ascii=False))
-                    return
-
-                # 停止指定actionGroupID的播放
-                if (client_id in self.client_playback_tasks and
-                        action_group_id in self.client_playback_tasks[client_id]):
-                    self._cleanup_playback_task(client_id, action_group_id)
-
-                    # 发送停止确认
-                    stop_ack = {
-                        "type": "actionStopAck",
-                        "data": {
-                            "status": "stopped",
-                            "message": "播放已停止",
-                            "actionGroupID": action_group_id
-                        },
-                        "timestamp": int(datetime.now().timestamp() * 1000)
-                    }
-                    await websocket.send(json.dumps(stop_ack, ensure_ascii=False))
-                    logger.info(f"客户端 {client_id} 停止播放，actionGroupID: {action_group_id}")
-                else:
-                    # 没有找到对应的播放任务
-                    error_msg = {
-                        "type": "error",
-                        "data": {
-                            "message": f"未找到actionGroupID为 {action_group_id} 的播放任务",
-                            "actionGroupID": action_group_id
-                        },
-                        "timestamp": int(datetime.now().timestamp() * 1000)
-                    }
-                    await websocket.send(json.dumps(error_msg, ensure_ascii=False))
-
-            elif msg_type == 'actionReset':
-                # 重置所有播放
-                await self._stop_all_playback(client_id, websocket)
-                logger.info(f"客户端 {client_id} 重置所有播放任务")
-
-            elif msg_type == 'echo':
-                # 回声测试
-                response = {
-                    "type": "echo_response",
-                    "data": {
-                        "original_message": data.get('message', ''),
-                        "server_note": "这是回声测试的响应"
-                    },
-                    "timestamp": int(datetime.now().timestamp() * 1000)
-                }
-                await websocket.send(json.dumps(response, ensure_ascii=False))
-
-            elif msg_type == 'broadcast':
-                # 广播消息
-                broadcast_msg = {
-                    "type": "broadcast",
-                    "data": {
-                        "message": data.get('message', ''),
-                        "from_client": client_id
-                    },
-                    "timestamp": int(datetime.now().timestamp() * 1000)
-                }
-                await self.broadcast_message(json.dumps(broadcast_msg, ensure_ascii=False), sender=websocket)
-
-            elif msg_type == 'get_server_info':
-                # 获取服务器信息
-                server_info = {
-                    "type": "server_info",
-                    "data": {
-                        "host": self.host,
-                        "port": self.port,
-                        "protocol": "ws",
-                        "connected_clients": len(self.connected_clients),
-                        "server_ips": get_local_ipv4_addresses()
-                    },
-                    "timestamp": int(datetime.now().timestamp() * 1000)
-                }
-                await websocket.send(json.dumps(server_info, ensure_ascii=False))
-
-            elif msg_type == 'heartbeat':
-                # 心跳响应
-                heartbeat_ack = {
-                    "type": "heartbeatAck",
-                    "data": {
-                        "status": "alive",
-                        "message": "服务器运行正常"
-                    },
-                    "timestamp": int(datetime.now().timestamp() * 1000)
-                }
-                await websocket.send(json.dumps(heartbeat_ack, ensure_ascii=False))
-
-            else:
-                # 未知消息类型的默认响应
-                response = {
-                    "type": "unknown_command",
-                    "data": {
-                        "received_message": data,
-                        "note": "未知的消息类型"
-                    },
-                    "timestamp": int(datetime.now().timestamp() * 1000)
-                }
-                await websocket.send(json.dumps(response, ensure_ascii=False))
-
-        except json.JSONDecodeError:
+            data = _loads(message)
+        except _JSONDecodeError:
             # JSON解析错误时也发送ack，但状态为error
-            error_ack = {
-                "type": "ack",
-                "data": {
-                    "status": "error",
-                    "message": "无效的JSON格式，消息解析失败"
-                },
-                "timestamp": int(datetime.now().timestamp() * 1000)
-            }
-            await websocket.send(json.dumps(error_ack, ensure_ascii=False))
+            await websocket.send(_PARSE_ERROR_ACK_TMPL % self._now_ms())
 
             # 同时发送错误消息
+            await websocket.send(_PARSE_ERROR_TMPL % (_dumps(message), self._now_ms()))
+            return
+
+        # 客户端可能把多条消息合并为一个JSON数组发送，逐条处理；
+        # 限制条数，避免单帧触发大量ack、播放任务和广播
+        if isinstance(data, list):
+            if len(data) > MAX_BATCH_MESSAGES:
+                logger.warning("客户端 %s 批量消息过多: %s 条", client_id, len(data))
+                await websocket.send(_BATCH_TOO_LARGE_TMPL % (len(data), MAX_BATCH_MESSAGES, self._now_ms()))
+                return
+            messages = data
+        else:
+            messages = (data,)
+
+        for item in messages:
+            if not isinstance(item, dict):
+                # 非JSON对象的消息无法处理，跳过
+                logger.debug("忽略客户端 %s 的非对象消息: %r", client_id, item)
+                continue
+            await self.dispatch_message(websocket, item, client_id)
+
+    async def dispatch_message(self, websocket, data, client_id):
+        """处理单条已解析的消息"""
+        # 每条消息都会触发，只在DEBUG级别输出
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("收到来自客户端 %s 的消息: %s", client_id, data)
+
+        # 首先发送ack确认消息
+        original_message = data.get('message', str(data))
+        await self.send_ack(websocket, original_message)
+
+        # 根据消息类型查表分发，未知类型走默认响应
+        msg_type = data.get('type', 'unknown')
+        handler = self._handlers.get(msg_type) if isinstance(msg_type, str) else None
+        await (handler or self._h_unknown)(websocket, data, client_id)
+
+    async def _h_start(self, websocket, data, client_id):
+        """actionStart：开始播放"""
+        action_group_id = data.get('actionGroupID')
+        if not action_group_id:
+            await websocket.send(_MISSING_AID_TMPL % self._now_ms())
+            return
+
+        # 如果已经有播放任务在运行，先停止之前的
+        current_playing_id = self._current.get(client_id)
+        if current_playing_id is not None:
+            if (client_id, current_playing_id) in self._tasks:
+                self._cleanup_playback_task(client_id, current_playing_id)
+                logger.info("停止之前的播放任务，actionGroupID: %s", current_playing_id)
+
+        # 创建新的播放任务
+        task = asyncio.create_task(self.simulate_playback(websocket, client_id, action_group_id))
+
+        # 存储任务引用
+        self._tasks[(client_id, action_group_id)] = task
+        self._client_aids.setdefault(client_id, set()).add(action_group_id)
+        self._current[client_id] = action_group_id
+
+        # 发送开始确认
+        await websocket.send(_START_ACK_TMPL % (_dumps(action_group_id), self._now_ms()))
+
+    async def _h_stop(self, websocket, data, client_id):
+        """actionStop：停止指定actionGroupID的播放"""
+        action_group_id = data.get('actionGroupID')
+        if not action_group_id:
+            await websocket.send(_MISSING_AID_TMPL % self._now_ms())
+            return
+
+        if (client_id, action_group_id) in self._tasks:
+            self._cleanup_playback_task(client_id, action_group_id)
+
+            # 发送停止确认
+            await websocket.send(_STOP_ACK_TMPL % (_dumps(action_group_id), self._now_ms()))
+            logger.info("客户端 %s 停止播放，actionGroupID: %s", client_id, action_group_id)
+        else:
+            # 没有找到对应的播放任务
             error_msg = {
                 "type": "error",
                 "data": {
-                    "message": "无效的JSON格式",
-                    "original_message": message
+                    "message": f"未找到actionGroupID为 {action_group_id} 的播放任务",
+                    "actionGroupID": action_group_id
                 },
-                "timestamp": int(datetime.now().timestamp() * 1000)
+                "timestamp": self._now_ms()
             }
-            await websocket.send(json.dumps(error_msg, ensure_ascii=False))
-
-    async def broadcast_message(self, message, sender=None):
-        """向所有连接的客户端广播消息"""
-        if self.connected_clients:
-            tasks = []
-            for client in self.connected_clients:
-                if client != sender:  # 不发送给消息发送者
-                    try:
-                        tasks.append(client.send(message))
-                    except:
-                        # 如果发送失败，从连接列表中移除
-                        self.connected_clients.remove(client)
-            if tasks:
-                await asyncio.gather(*tasks, return_exceptions=True)
+            await websocket.send(_dumps(error_msg))
+
+    async def _h_reset(self, websocket, data, client_id):
+        """actionReset：重置所有播放"""
+        await self._stop_all_playback(client_id, websocket)
+        logger.info("客户端 %s 重置所有播放任务", client_id)
+
+    async def _h_echo(self, websocket, data, client_id):
+        """echo：回声测试"""
+        await websocket.send(_ECHO_TMPL % (_dumps(data.get('message', '')), self._now_ms()))
+
+    async def _h_broadcast(self, websocket, data, client_id):
+        """broadcast：广播消息"""
+        broadcast_msg = {
+            "type": "broadcast",
+            "data": {
+                "message": data.get('message', ''),
+                "from_client": client_id
+            },
+            "timestamp": self._now_ms()
+        }
+        payload = _dumps(broadcast_msg)
+        await self.broadcast_message(payload, sender_id=client_id)
+
+    async def _h_info(self, websocket, data, client_id):
+        """get_server_info：获取服务器信息"""
+        server_info = {
+            "type": "server_info",
+            "data": {
+                "host": self.host,
+                "port": self.port,
+                "protocol": "ws",
+                "connected_clients": len(self._clients),
+                "server_ips": self._get_ips()
+            },
+            "timestamp": self._now_ms()
+        }
+        await websocket.send(_dumps(server_info))
+
+    async def _h_heartbeat(self, websocket, data, client_id):
+        """heartbeat：心跳响应"""
+        await websocket.send(_HEARTBEAT_ACK_TMPL % self._now_ms())
+
+    async def _h_unknown(self, websocket, data, client_id):
+        """未知消息类型的默认响应"""
+        response = {
+            "type": "unknown_command",
+            "data": {
+                "received_message": data,
+                "note": "未知的消息类型"
+            },
+            "timestamp": self._now_ms()
+        }
+        await websocket.send(_dumps(response))
+
+    async def broadcast_message(self, payload: str, sender_id: Optional[int] = None):
+        """
+        向所有连接的客户端广播消息
+        :param payload: 已序列化好的JSON文本，调用方只序列化一次，所有连接共用
+        :param sender_id: 发送者的client_id，广播不会发回给发送者
+        """
+        # 不发送给消息发送者；broadcast()只编码一次帧并直接写入各连接的缓冲区，
+        # 未处于打开状态的连接会被自动跳过
+        # 写缓冲区积压的慢客户端会被跳过，不拖累其他连接
+        targets = [client for cid, client in self._clients.items()
+                   if cid != sender_id and _writable(client)]
+        if targets:
+            websockets.broadcast(targets, payload)
 
     def log_network_info(self):
         """输出网络信息到日志"""
         logger.info("=== 服务器网络信息 ===")
+        protocol = "ws"
 
-        hostname = socket.gethostname()
-        logger.info(f"主机名: {hostname}")
+        logger.info("主机名: %s", _HOSTNAME)
 
         ipv4_addresses = get_local_ipv4_addresses()
 
@@ -453,25 +495,16 @@ class WebSocketServer:
         else:
             logger.info("本机IPv4地址列表:")
             for ip in ipv4_addresses:
-                if ip.startswith('192.168.'):
-                    ip_type = "局域网IP (192.168.x.x)"
-                elif ip.startswith('10.'):
-                    ip_type = "局域网IP (10.x.x.x)"
-                elif ip.startswith('172.16.') or (ip.startswith('172.') and
-                                                  16 <= int(ip.split('.')[1]) <= 31):
-                    ip_type = "局域网IP (172.16.x.x-172.31.x.x)"
-                else:
-                    ip_type = "公网IP"
-                logger.info(f"  - {ip} ({ip_type})")
+                ip_type = classify_ip(ip)
+                logger.info("  - %s (%s)", ip, ip_type)
 
             # 显示访问地址
-            protocol = "ws"
             logger.info("可访问地址:")
             for ip in ipv4_addresses:
-                logger.info(f"  - {protocol}://{ip}:{self.port}")
+                logger.info("  - %s://%s:%s", protocol, ip, self.port)
 
-        logger.info(f"本地回环地址: {protocol}://127.0.0.1:{self.port}")
-        logger.info(f"选择的监听地址: {self.host}:{self.port}")
+        logger.info("本地回环地址: %s://127.0.0.1:%s", protocol, self.port)
+        logger.info("选择的监听地址: %s:%s", self.host, self.port)
         logger.info("===")
 
     async def start_server(self):
@@ -480,25 +513,47 @@ class WebSocketServer:
         self.log_network_info()
 
         protocol = "ws"
-        logger.info(f"启动WebSocket服务器在 {protocol}://{self.host}:{self.port}")
+        logger.info("启动WebSocket服务器在 %s://%s:%s", protocol, self.host, self.port)
 
         # 启动服务器
+        # 消息都是键名高度重复的小JSON，开启permessage-deflate；
+        # 缩小滑动窗口和memLevel以限制每个连接的压缩内存
         async with websockets.serve(
                 self.handle_client,
                 self.host,
-                self.port
+                self.port,
+                max_queue=32,
+                write_limit=2 ** 16,
+                compression=None,
+                extensions=[
+                    ServerPerMessageDeflateFactory(
+                        server_max_window_bits=12,
+                        client_max_window_bits=12,
+                        compress_settings={"memLevel": 5},
+                    )
+                ]
         ):
             logger.info("服务器已启动，等待客户端连接...")
             await asyncio.Future()  # 永久运行
 
 
+def run(main):
+    """运行协程，uvloop可用时使用基于libuv的事件循环"""
+    if uvloop is None:
+        return asyncio.run(main)
+    if sys.version_info >= (3, 12):
+        return asyncio.run(main, loop_factory=uvloop.new_event_loop)
+    uvloop.install()
+    return asyncio.run(main)
+
+
 if __name__ == "__main__":
     # 自动选择IP地址
     server = WebSocketServer()
 
     try:
-        asyncio.run(server.start_server())
+        run(server.start_server())
     except KeyboardInterrupt:
         logger.info("服务器被用户中断")
     except Exception as e:
-        logger.error(f"服务器运行错误: {e}")
\ No newline at end of file
+        logger.error("服务器运行错误: %s", e)
\ No newline at end of file